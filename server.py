@@ -3,218 +3,733 @@
 HTTP server that serves static files and proxies API requests to Databricks
 """
 import os
+import sys
+import atexit
+import contextlib
+import email.utils
+import functools
+import gzip
+import hashlib
 import http.server
+import logging
+import logging.handlers
+import mimetypes
+import mmap
+import queue
+import signal
+import socket
 import socketserver
-from urllib.parse import urlparse
-import urllib.request
+import threading
+from collections import namedtuple
+from urllib.parse import unquote, urlparse
 import json
 
-# Try to import Databricks SDK for config
+import urllib3
+
+# Log through a queue so request threads never block on stdout writes,
+# a listener thread does the actual I/O
+log = logging.getLogger('server')
+log.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+log.propagate = False
+_log_queue = queue.SimpleQueue()
+log.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener = None
+
+def start_log_listener():
+    """Start the thread that drains the log queue to stdout, once per process"""
+    global _log_listener
+    _log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler(sys.stdout))
+    _log_listener.start()
+
+def stop_log_listener():
+    """Flush whatever is still queued and stop the listener thread"""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+start_log_listener()
+atexit.register(stop_log_listener)
+
+# Brotli is optional, without it text assets are only pre-compressed with gzip
 try:
-    from databricks.sdk.config import Config as SdkConfig
-    DATABRICKS_SDK_AVAILABLE = True
+    import brotli
+    BROTLI_AVAILABLE = True
 except ImportError:
-    DATABRICKS_SDK_AVAILABLE = False
-    print("⚠️  Databricks SDK not available, using environment variables only")
+    BROTLI_AVAILABLE = False
 
 PORT = int(os.getenv('PORT', 8080))
+STATIC_DIR = 'dist'
+
+def cgroup_cpu_limit():
+    """Whole CPUs allowed by the container's cgroup CPU quota, or None if unlimited"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+    except (OSError, ValueError):
+        # cgroup v1 keeps the quota and period in separate files
+        try:
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+                quota = f.read().strip()
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+                period = f.read().strip()
+        except OSError:
+            return None
+    if quota in ('max', '-1'):
+        return None
+    try:
+        quota, period = int(quota), int(period)
+    except ValueError:
+        return None
+    if quota <= 0 or period <= 0:
+        return None
+    return max(1, -(-quota // period))
+
+def usable_cpu_count():
+    """CPUs this process may run on (like nproc), capped by any cgroup CPU quota"""
+    if hasattr(os, 'process_cpu_count'):
+        count = os.process_cpu_count() or 1
+    elif hasattr(os, 'sched_getaffinity'):
+        count = len(os.sched_getaffinity(0)) or 1
+    else:
+        count = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    return min(count, limit) if limit else count
+
+CPU_COUNT = usable_cpu_count()
+
+# Worker processes accepting on the shared listening socket, so header parsing
+# and the rest of the Python-side work isn't limited to one core by the GIL
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', CPU_COUNT)) if hasattr(os, 'fork') else 1
+
+# Cap on requests handled at once per worker. Handler threads mostly sit
+# blocked on the upstream Databricks socket, so a lone worker allows many more
+# than there are cores; with several workers keep each one's memory predictable.
+if WEB_CONCURRENCY > 1:
+    _default_http_workers = max(8, 2 * CPU_COUNT)
+else:
+    _default_http_workers = min(256, CPU_COUNT * 32)
+HTTP_WORKERS = int(os.getenv('HTTP_WORKERS', _default_http_workers))
+SEM = threading.BoundedSemaphore(HTTP_WORKERS)
+
+# Handler threads keep the platform stack size by default: a smaller stack saves
+# address space but deep C-level recursion (json, re, ssl) can overflow it and
+# crash the process. Set HTTP_THREAD_STACK_KB to opt in to a smaller stack.
+HTTP_THREAD_STACK_KB = max(0, int(os.getenv('HTTP_THREAD_STACK_KB', 0)))
+if 0 < HTTP_THREAD_STACK_KB < 32:
+    log.warning("⚠️  HTTP_THREAD_STACK_KB=%d is below the 32KB minimum, keeping the default", HTTP_THREAD_STACK_KB)
+    HTTP_THREAD_STACK_KB = 0
+try:
+    threading.stack_size(HTTP_THREAD_STACK_KB * 1024)
+except ValueError as e:
+    log.warning("⚠️  Could not set thread stack size, keeping the default: %s", e)
 
 # Get Databricks configuration
 def get_databricks_config():
-    """Get Databricks host from SDK config"""
-    if DATABRICKS_SDK_AVAILABLE:
-        try:
-            cfg = SdkConfig()
-            return {
-                'host': cfg.host or os.getenv('DATABRICKS_HOST', ''),
-                'token': os.getenv('DATABRICKS_TOKEN', ''),  # For local dev
-            }
-        except Exception as e:
-            print(f"⚠️  Could not get SDK config: {e}")
+    """Get Databricks host from the environment, falling back to SDK config"""
+    token = os.getenv('DATABRICKS_TOKEN', '')  # For local dev
+    
+    # Databricks Apps sets DATABRICKS_HOST, so the SDK (and everything it
+    # imports) is only loaded when the host has to be discovered
+    host = os.getenv('DATABRICKS_HOST')
+    if host:
+        return {'host': host, 'token': token}
     
-    return {
-        'host': os.getenv('DATABRICKS_HOST', ''),
-        'token': os.getenv('DATABRICKS_TOKEN', ''),
-    }
+    try:
+        from databricks.sdk.config import Config as SdkConfig
+    except ImportError:
+        log.warning("⚠️  Databricks SDK not available, using environment variables only")
+        return {'host': '', 'token': token}
+    
+    try:
+        cfg = SdkConfig()
+        return {'host': cfg.host or '', 'token': token}
+    except Exception as e:
+        log.warning("⚠️  Could not get SDK config: %s", e)
+        return {'host': '', 'token': token}
 
 # Initialize config
 databricks_config = get_databricks_config()
 
+# Hot-path constants for request dispatch and proxying
+_API_PREFIX = '/api/'
+_HOST = databricks_config['host']
+
+# Send buffer for client sockets, large enough to take a whole bundle or a
+# big proxied response without waiting on the client to ack
+SOCKET_SNDBUF = int(os.getenv('SOCKET_SNDBUF', 1 << 20))
+
+# Static files up to this size are memory-mapped at startup, bigger ones are
+# streamed with sendfile() on each request
+STATIC_MMAP_MAX = int(os.getenv('STATIC_MMAP_MAX', 4 << 20))
+
+StaticEntry = namedtuple('StaticEntry', ['data', 'mtime', 'size', 'content_type', 'etag', 'variants'])
+EncodedVariant = namedtuple('EncodedVariant', ['encoding', 'data', 'size', 'etag'])
+
+# Text assets worth compressing, images and fonts are already compressed
+COMPRESSIBLE_TYPES = frozenset({'.js', '.css', '.html', '.svg', '.json'})
+
+def compress_variants(data, etag):
+    """Pre-compress an asset once, smallest encoding first, dropping any that don't help"""
+    variants = [('gzip', gzip.compress(data, 9, mtime=0))]
+    if BROTLI_AVAILABLE:
+        variants.append(('br', brotli.compress(data, quality=11)))
+    return tuple(sorted(
+        (EncodedVariant(encoding, body, str(len(body)), f'{etag[:-1]}-{encoding}"')
+         for encoding, body in variants if len(body) < len(data)),
+        key=lambda variant: len(variant.data),
+    ))
+
+def accepted_encodings(header):
+    """Content codings from an Accept-Encoding header, leaving out any refused with q=0"""
+    accepted = set()
+    for token in header.split(','):
+        coding, *params = token.split(';')
+        coding = coding.strip().lower()
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding and q > 0:
+            accepted.add(coding)
+    return accepted
+
+def load_static_files(root):
+    """Memory-map the built app so hot assets are served without open/stat/read"""
+    static = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+                if not 0 < st.st_size <= STATIC_MMAP_MAX:
+                    continue
+                with open(path, 'rb') as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError) as e:
+                log.warning("⚠️  Could not map %s: %s", path, e)
+                continue
+            
+            etag = f'"{int(st.st_mtime)}-{st.st_size}"'
+            variants = ()
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_TYPES:
+                variants = compress_variants(mm[:], etag)
+            
+            key = os.path.relpath(path, root).replace(os.sep, '/')
+            static[key] = StaticEntry(
+                data=memoryview(mm),
+                mtime=st.st_mtime,
+                size=str(st.st_size),
+                content_type=mimetypes.guess_type(name)[0] or 'application/octet-stream',
+                etag=etag,
+                variants=variants,
+            )
+    return static
+
+STATIC = load_static_files(STATIC_DIR)
+
+# Path resolution and MIME lookups for files outside the mmap cache, memoized
+# per URL path since a client keeps requesting the same handful of assets
+@functools.lru_cache(maxsize=256)
+def _guess(path):
+    """Content type for a file path"""
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+@functools.lru_cache(maxsize=256)
+def _resolve(path):
+    """Map a URL path to a file path under dist/, or None if it tries to escape it"""
+    return _safe_translate(path)
+
+def _safe_translate(path):
+    """SimpleHTTPRequestHandler.translate_path for dist/, rejecting '..' instead of dropping it"""
+    path = path.split('?', 1)[0].split('#', 1)[0]
+    trailing_slash = path.rstrip().endswith('/')
+    try:
+        path = unquote(path, errors='surrogatepass')
+    except UnicodeDecodeError:
+        path = unquote(path)
+    words = [word for word in path.split('/') if word and word != os.curdir]
+    if any(word == os.pardir or os.path.dirname(word) for word in words):
+        return None
+    path = os.path.join(STATIC_DIR, *words)
+    if trailing_slash:
+        path += '/'
+    return path
+
+# Upstream connection pool for the one Databricks host we proxy to, keeps TLS
+# connections alive between proxied requests instead of handshaking on every
+# call. Only failing to connect is retried: once a request has been sent it may
+# have run upstream, and a read timeout would double the wait. urllib3 already
+# drops idle connections the server closed before reusing them.
+POOL = urllib3.connection_from_url(
+    f"https://{_HOST}",
+    maxsize=int(os.getenv('UPSTREAM_POOL', 64)),
+    block=False,
+    retries=urllib3.Retry(total=1, connect=1, read=0, status=0, other=0, redirect=False),
+    timeout=urllib3.Timeout(connect=5, read=60),
+) if _HOST else None
+
+class _BodyReader:
+    """Request body handed to urllib3 as 64KB chunks read straight off the client socket"""
+    def __init__(self, rfile, length):
+        self.rfile = rfile
+        self.length = length
+    
+    def __iter__(self):
+        remaining = self.length
+        while remaining > 0:
+            chunk = self.rfile.read(min(65536, remaining))
+            if not chunk:
+                raise ConnectionError("Client closed the connection before sending the full body")
+            remaining -= len(chunk)
+            yield chunk
+
+# Cache headers added to every HTML response, pre-encoded as one header block
+_HTML_CACHE_HEADERS = b'Cache-Control: no-cache, must-revalidate\r\nPragma: no-cache\r\nExpires: 0\r\n'
+
+# Hop-by-hop headers (RFC 7230) apply to a single connection and must not be
+# forwarded from the upstream response
+_HOP_BY_HOP = frozenset({
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailers', 'transfer-encoding', 'upgrade',
+})
+
+# Build config.js once, everything it contains is fixed at process start
+def build_config_js():
+    """Render the runtime config script served at /config.js"""
+    # Use SDK config for host (OBO-aware)
+    databricks_host = databricks_config['host']
+    
+    # Get resource IDs from environment (set via valueFrom in app.yaml)
+    genie_space_id = os.getenv('GENIE_SPACE_ID', '')
+    sql_warehouse_id = os.getenv('SQL_WAREHOUSE_ID', '')
+    
+    # Get OAuth/OBO info if available
+    client_id = os.getenv('DATABRICKS_CLIENT_ID', '')
+    is_obo = bool(client_id)  # If client_id exists, we're using OBO
+    
+    return f"""
+// Runtime configuration injected by server
+window.APP_CONFIG = {{
+  databricksHost: '{databricks_host or ''}',
+  genieSpaceId: '{genie_space_id}',
+  sqlWarehouseId: '{sql_warehouse_id}',
+  isOBO: {str(is_obo).lower()},
+  clientId: '{client_id}'
+}};
+console.log('✅ Runtime config loaded from server:', window.APP_CONFIG);
+console.log('🔐 Authentication mode:', window.APP_CONFIG.isOBO ? 'OAuth/OBO' : 'Token');
+""".encode('utf-8')
+
+_CONFIG_JS = build_config_js()
+_CONFIG_JS_LEN = str(len(_CONFIG_JS))
+_CONFIG_ETAG = '"' + hashlib.sha1(_CONFIG_JS).hexdigest() + '"'
+_CONFIG_JS_HEADERS = (
+    ('Content-Type', 'application/javascript'),
+    ('Content-Length', _CONFIG_JS_LEN),
+    ('ETag', _CONFIG_ETAG),
+    ('Cache-Control', 'no-cache, must-revalidate'),
+)
+_CONFIG_JS_304_HEADERS = (('ETag', _CONFIG_ETAG),)
+
+# Fixed reply for non-API writes
+_METHOD_NOT_ALLOWED = b'Method not allowed'
+_METHOD_NOT_ALLOWED_HEADERS = (
+    ('Content-Type', 'text/plain'),
+    ('Content-Length', str(len(_METHOD_NOT_ALLOWED))),
+    ('Allow', 'GET, HEAD'),
+)
+
 class CustomHandler(http.server.SimpleHTTPRequestHandler):
     def __init__(self, *args, **kwargs):
-        super().__init__(*args, directory='dist', **kwargs)
+        super().__init__(*args, directory=STATIC_DIR, **kwargs)
     
     def proxy_api_request(self, method='GET', body=None):
         """Proxy API requests to Databricks"""
+        if not _HOST:
+            self.send_error(500, "Databricks host not configured")
+            return
+        
+        log.debug("🔄 Proxying %s https://%s%s", method, _HOST, self.path)
+        
+        # Create request with headers
+        headers = {
+            'Content-Type': 'application/json',
+            'User-Agent': 'Databricks-App/1.0',
+        }
+        
+        # Get OBO token from X-Forwarded-Access-Token header (Databricks Apps)
+        obo_token = self.headers.get('X-Forwarded-Access-Token')
+        if obo_token:
+            headers['Authorization'] = f'Bearer {obo_token}'
+            log.debug("🔐 Using OBO token from X-Forwarded-Access-Token")
+        elif 'Authorization' in self.headers:
+            headers['Authorization'] = self.headers['Authorization']
+            log.debug("🔐 Using Authorization header from request")
+        else:
+            log.warning("⚠️ No authentication token found!")
+        
+        if body is not None:
+            headers['Content-Length'] = str(body.length)
+        
+        # Make the request over a pooled keep-alive connection. Every status,
+        # errors included, comes back as a normal response and is relayed
+        # as-is; only failing to reach Databricks at all raises.
         try:
-            # Get Databricks host
-            host = databricks_config['host']
-            if not host:
-                self.send_error(500, "Databricks host not configured")
-                return
-            
-            # Build full URL
-            url = f"https://{host}{self.path}"
-            print(f"🔄 Proxying {method} {url}")
+            response = POOL.urlopen(
+                method, self.path, body=body, headers=headers,
+                redirect=False, preload_content=False, decode_content=False,
+            )
+        except Exception as e:
+            log.error("❌ Proxy error: %s", e)
+            self.send_error(502, f"Proxy error: {str(e)}")
+            return
+        
+        try:
+            if response.status >= 400:
+                log.warning("❌ API Error %s: %s", response.status, response.reason)
             
-            # Create request with headers
-            headers = {
-                'Content-Type': 'application/json',
-                'User-Agent': 'Databricks-App/1.0',
-            }
+            # Send response back to client
+            self.send_response(response.status)
+            for header, value in response.headers.items():
+                if header.lower() in _HOP_BY_HOP:
+                    continue
+                self.send_header(header, value)
+            self.end_headers()
             
-            # Get OBO token from X-Forwarded-Access-Token header (Databricks Apps)
-            obo_token = self.headers.get('X-Forwarded-Access-Token')
-            if obo_token:
-                headers['Authorization'] = f'Bearer {obo_token}'
-                print(f"🔐 Using OBO token from X-Forwarded-Access-Token")
-            elif 'Authorization' in self.headers:
-                headers['Authorization'] = self.headers['Authorization']
-                print(f"🔐 Using Authorization header from request")
-            else:
-                print(f"⚠️ No authentication token found!")
+            # Stream the body through in 64KB chunks without buffering it
+            for chunk in response.stream(65536):
+                self.wfile.write(chunk)
+        except Exception as e:
+            # The status line is already out, so there's no error page to
+            # send; cut the client off and don't pool the half-read connection
+            log.error("❌ Proxy error while relaying response: %s", e)
+            response.close()
+            self.close_connection = True
+        finally:
+            response.release_conn()
+    
+    def do_GET(self):
+        with SEM:
+            # Exact-match routes first, then the Databricks proxy, then dist/
+            handler = _EXACT_GET.get(self.path)
+            if handler is not None:
+                handler(self)
+            elif not self._proxy_if_api('GET', False):
+                self.serve_static()
+    
+    def serve_config_js(self):
+        """Serve the runtime config built at startup"""
+        if self.is_fresh(_CONFIG_ETAG):
+            self._send_fixed(304, _CONFIG_JS_304_HEADERS)
+        else:
+            self._send_fixed(200, _CONFIG_JS_HEADERS, _CONFIG_JS)
+    
+    @contextlib.contextmanager
+    def corked(self):
+        """Coalesce headers and body into full TCP segments while writing (Linux only)"""
+        if not hasattr(socket, 'TCP_CORK'):
+            yield
+            return
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1)
+        try:
+            yield
+        finally:
+            try:
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 0)
+            except OSError:
+                pass
+    
+    def serve_static(self):
+        """Serve a file from dist/, from the startup mmap cache or with os.sendfile()"""
+        key = unquote(urlparse(self.path).path).lstrip('/')
+        if not key or key.endswith('/'):
+            key += 'index.html'
+        entry = STATIC.get(key)
+        if entry is not None:
+            # Pick the smallest pre-compressed body the client accepts
+            body, size, etag, encoding = entry.data, entry.size, entry.etag, None
+            if entry.variants:
+                accepted = accepted_encodings(self.headers.get('Accept-Encoding', ''))
+                for variant in entry.variants:
+                    if variant.encoding in accepted:
+                        body, size, etag, encoding = variant.data, variant.size, variant.etag, variant.encoding
+                        break
             
-            # Make the request
-            req = urllib.request.Request(url, headers=headers, method=method)
-            if body:
-                req.data = body
+            vary = 'Accept-Encoding' if entry.variants else None
+            if self.not_modified(etag, entry.mtime, vary):
+                return
+            with self.corked():
+                self.send_response(200)
+                self.send_header('Content-Type', entry.content_type)
+                self.send_header('Content-Length', size)
+                self.send_header('Last-Modified', self.date_time_string(entry.mtime))
+                self.send_header('ETag', etag)
+                if encoding:
+                    self.send_header('Content-Encoding', encoding)
+                if vary:
+                    self.send_header('Vary', vary)
+                self.end_headers()
+                # Written straight from memory, no Python-side copy of the payload
+                self.wfile.write(body)
+            return
+        
+        # Not pre-mapped (too big, or added after startup): copy it kernel-to-kernel
+        if not hasattr(os, 'sendfile'):
+            super().do_GET()
+            return
+        
+        path = _resolve(self.path)
+        if path is None:
+            self.send_error(404, "File not found")
+            return
+        if os.path.isdir(path):
+            # Directories only get the fast path for their index.html, the
+            # redirect and listing logic stays in SimpleHTTPRequestHandler
+            index = os.path.join(path, 'index.html')
+            if not urlparse(self.path).path.endswith('/') or not os.path.isfile(index):
+                super().do_GET()
+                return
+            path = index
+        
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            self.send_error(404, "File not found")
+            return
+        
+        try:
+            st = os.fstat(fd)
+            etag = f'"{int(st.st_mtime)}-{st.st_size}"'
+            if self.not_modified(etag, st.st_mtime):
+                return
             
-            with urllib.request.urlopen(req) as response:
-                # Send response back to client
-                self.send_response(response.status)
-                for header, value in response.headers.items():
-                    if header.lower() not in ['transfer-encoding', 'connection']:
-                        self.send_header(header, value)
+            with self.corked():
+                self.send_response(200)
+                self.send_header('Content-Type', _guess(path))
+                self.send_header('Content-Length', str(st.st_size))
+                self.send_header('Last-Modified', self.date_time_string(st.st_mtime))
+                self.send_header('ETag', etag)
                 self.end_headers()
-                self.wfile.write(response.read())
                 
-        except urllib.error.HTTPError as e:
-            print(f"❌ API Error {e.code}: {e.reason}")
-            self.send_response(e.code)
-            self.send_header('Content-Type', 'application/json')
+                # Move the file kernel-to-kernel straight into the client socket
+                out = self.wfile.fileno()
+                offset = 0
+                while offset < st.st_size:
+                    try:
+                        sent = os.sendfile(out, fd, offset, st.st_size - offset)
+                    except BlockingIOError:
+                        continue
+                    if sent == 0:
+                        break
+                    offset += sent
+        finally:
+            os.close(fd)
+    
+    def not_modified(self, etag, mtime=None, vary=None):
+        """Answer 304 if the client's cached copy is still current"""
+        fresh = self.is_fresh(etag, mtime)
+        if fresh:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            if vary:
+                self.send_header('Vary', vary)
             self.end_headers()
-            error_body = e.read() if e.fp else b'{}'
-            self.wfile.write(error_body)
-        except Exception as e:
-            print(f"❌ Proxy error: {e}")
-            self.send_error(500, f"Proxy error: {str(e)}")
+        return fresh
     
-    def do_GET(self):
-        # Proxy API requests to Databricks
-        if self.path.startswith('/api/'):
-            self.proxy_api_request('GET')
+    def is_fresh(self, etag, mtime=None):
+        """Check the request's If-None-Match / If-Modified-Since against a resource"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or etag in tags or f'W/{etag}' in tags
+        if mtime is not None and 'If-Modified-Since' in self.headers:
+            try:
+                since = email.utils.parsedate_to_datetime(self.headers['If-Modified-Since'])
+            except (TypeError, IndexError, OverflowError, ValueError):
+                return False
+            return since.tzinfo is not None and int(mtime) <= since.timestamp()
+        return False
+    
+    def _send_fixed(self, status, headers, body=b''):
+        """Write a complete response as one prebuilt block, headers and small bodies in a single write"""
+        self.log_request(status)
+        if self.request_version == 'HTTP/0.9':
+            self.wfile.write(body)
             return
-        
-        # Inject config for /config.js requests
-        if self.path == '/config.js':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/javascript')
-            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-            self.end_headers()
-            
-            # Get values from config and environment
-            # Use SDK config for host (OBO-aware)
-            databricks_host = databricks_config['host']
-            
-            # Get resource IDs from environment (set via valueFrom in app.yaml)
-            genie_space_id = os.getenv('GENIE_SPACE_ID', '')
-            sql_warehouse_id = os.getenv('SQL_WAREHOUSE_ID', '')
-            
-            # Get OAuth/OBO info if available
-            client_id = os.getenv('DATABRICKS_CLIENT_ID', '')
-            is_obo = bool(client_id)  # If client_id exists, we're using OBO
-            
-            # Log what we're sending
-            print(f"📤 Serving config.js:")
-            print(f"   databricksHost: {databricks_host}")
-            print(f"   genieSpaceId: {genie_space_id}")
-            print(f"   sqlWarehouseId: {sql_warehouse_id}")
-            print(f"   usingOBO: {is_obo}")
-            
-            # Generate JavaScript config
-            config_js = f"""
-// Runtime configuration injected by server
-window.APP_CONFIG = {{
-  databricksHost: '{databricks_host or ''}',
-  genieSpaceId: '{genie_space_id}',
-  sqlWarehouseId: '{sql_warehouse_id}',
-  isOBO: {str(is_obo).lower()},
-  clientId: '{client_id}'
-}};
-console.log('✅ Runtime config loaded from server:', window.APP_CONFIG);
-console.log('🔐 Authentication mode:', window.APP_CONFIG.isOBO ? 'OAuth/OBO' : 'Token');
-"""
-            self.wfile.write(config_js.encode())
+        head = (
+            f"{self.protocol_version} {status} {self.responses[status][0]}\r\n"
+            f"Date: {self.date_time_string()}\r\n"
+            + "".join(f"{name}: {value}\r\n" for name, value in headers)
+            + "\r\n"
+        ).encode('latin-1')
+        if len(body) <= 8192:
+            self.wfile.write(head + body)
         else:
-            # Serve static files normally
-            super().do_GET()
+            self.wfile.write(head)
+            self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        """Send the access log through the queued logger instead of stderr"""
+        log.info("%s - - [%s] " + format, self.address_string(), self.log_date_time_string(), *args)
+    
+    # Set per request in parse_request, False until a request line is parsed
+    _is_html = False
+    
+    def parse_request(self):
+        ok = super().parse_request()
+        self._is_html = ok and (self.path.endswith('.html') or self.path in ('/', '/index.html'))
+        return ok
     
     def end_headers(self):
-        # Add no-cache headers for HTML files to prevent stale content
-        if self.path.endswith('.html') or self.path == '/' or self.path == '/index.html':
-            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-            self.send_header('Pragma', 'no-cache')
-            self.send_header('Expires', '0')
+        # Make browsers revalidate HTML every time so they never run stale
+        # content, while still allowing a 304 when nothing changed
+        if self._is_html and self.request_version != 'HTTP/0.9':
+            self._headers_buffer.append(_HTML_CACHE_HEADERS)
         super().end_headers()
     
-    def do_POST(self):
-        # Proxy API requests to Databricks
-        if self.path.startswith('/api/'):
+    def _proxy_if_api(self, method, has_body):
+        """Proxy the request to Databricks if it targets /api/, return whether it did"""
+        if not self.path.startswith(_API_PREFIX):
+            return False
+        body = None
+        if has_body:
+            # Streamed to Databricks as it arrives instead of read into memory
             content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length) if content_length > 0 else None
-            self.proxy_api_request('POST', body)
-            return
-        
-        # For non-API POST requests, return 405
-        self.send_error(405, "Method not allowed")
+            body = _BodyReader(self.rfile, content_length) if content_length > 0 else None
+        self.proxy_api_request(method, body)
+        return True
+    
+    # Only /api/ is writable, everything else gets a 405
+    def do_POST(self):
+        with SEM:
+            if not self._proxy_if_api('POST', True):
+                self._send_fixed(405, _METHOD_NOT_ALLOWED_HEADERS, _METHOD_NOT_ALLOWED)
     
     def do_DELETE(self):
-        # Proxy DELETE requests to Databricks
-        if self.path.startswith('/api/'):
-            self.proxy_api_request('DELETE')
-            return
-        
-        # For non-API DELETE requests, return 405
-        self.send_error(405, "Method not allowed")
+        with SEM:
+            if not self._proxy_if_api('DELETE', False):
+                self._send_fixed(405, _METHOD_NOT_ALLOWED_HEADERS, _METHOD_NOT_ALLOWED)
     
     def do_PUT(self):
-        # Proxy PUT requests to Databricks
-        if self.path.startswith('/api/'):
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length) if content_length > 0 else None
-            self.proxy_api_request('PUT', body)
-            return
-        
-        # For non-API PUT requests, return 405
-        self.send_error(405, "Method not allowed")
+        with SEM:
+            if not self._proxy_if_api('PUT', True):
+                self._send_fixed(405, _METHOD_NOT_ALLOWED_HEADERS, _METHOD_NOT_ALLOWED)
     
     def do_PATCH(self):
-        # Proxy PATCH requests to Databricks
-        if self.path.startswith('/api/'):
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length) if content_length > 0 else None
-            self.proxy_api_request('PATCH', body)
-            return
-        
-        # For non-API PATCH requests, return 405
-        self.send_error(405, "Method not allowed")
+        with SEM:
+            if not self._proxy_if_api('PATCH', True):
+                self._send_fixed(405, _METHOD_NOT_ALLOWED_HEADERS, _METHOD_NOT_ALLOWED)
+
+# GET routes matched on the full request path with a single dict lookup
+_EXACT_GET = {
+    '/config.js': CustomHandler.serve_config_js,
+}
+
+class ThreadedServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """HTTP server that handles each connection on its own thread"""
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 512
+    
+    def get_request(self):
+        sock, addr = super().get_request()
+        try:
+            # Don't let Nagle hold back the tail of a response waiting for an ack
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_SNDBUF)
+        except OSError as e:
+            log.debug("Could not tune client socket: %s", e)
+        return sock, addr
+
+def run_workers(httpd, count):
+    """Fork worker processes that all serve from the already-bound listening socket"""
+    # Flush and stop the log thread, threads don't survive a fork
+    stop_log_listener()
+    
+    workers = []
+    stopping = False
+    
+    def stop_workers(signum, frame):
+        nonlocal stopping
+        if signum is not None:
+            stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    # Installed before forking so a SIGTERM during startup still reaches the
+    # workers already running. Workers reset it and just die on SIGTERM.
+    signal.signal(signal.SIGTERM, stop_workers)
+    
+    for _ in range(count):
+        if stopping:
+            break
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            start_log_listener()
+            try:
+                httpd.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                stop_log_listener()
+                os._exit(0)
+        workers.append(pid)
+    
+    start_log_listener()
+    log.info("👷 Started %d worker processes", len(workers))
+    
+    # When one worker exits (or we're asked to stop) take the rest down too.
+    # A worker dying on its own is a crash, so exit non-zero and let the
+    # platform restart the app.
+    exit_code = 0
+    try:
+        pid, status = os.wait()
+        if not stopping:
+            worker_code = os.waitstatus_to_exitcode(status)
+            log.error("❌ Worker %d exited unexpectedly (status %d), shutting down", pid, worker_code)
+            exit_code = worker_code if worker_code > 0 else 1
+    except ChildProcessError:
+        # Stopped before the first worker was forked
+        pass
+    except KeyboardInterrupt:
+        stopping = True
+    stop_workers(None, None)
+    for pid in workers:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    return exit_code
 
 if __name__ == '__main__':
     # Debug: Print configuration
-    print("=" * 60)
-    print("🔧 Configuration Check:")
-    print(f"   Databricks Host (from SDK): {databricks_config['host']}")
-    print(f"   DATABRICKS_HOST (env): {os.getenv('DATABRICKS_HOST', 'NOT SET')}")
-    print(f"   GENIE_SPACE_ID: {os.getenv('GENIE_SPACE_ID', 'NOT SET')}")
-    print(f"   SQL_WAREHOUSE_ID: {os.getenv('SQL_WAREHOUSE_ID', 'NOT SET')}")
-    print(f"   DATABRICKS_CLIENT_ID: {os.getenv('DATABRICKS_CLIENT_ID', 'NOT SET')[:20] + '...' if os.getenv('DATABRICKS_CLIENT_ID') else 'NOT SET'}")
-    print(f"   OAuth/OBO Mode: {'YES' if os.getenv('DATABRICKS_CLIENT_ID') else 'NO'}")
-    print(f"   PORT: {PORT}")
-    print("=" * 60)
-    
-    with socketserver.TCPServer(("", PORT), CustomHandler) as httpd:
-        print(f"🚀 Server started successfully on port {PORT}")
-        print(f"📁 Serving files from: dist/")
-        print(f"🌐 Access at: http://localhost:{PORT}")
-        httpd.serve_forever()
+    log.info("=" * 60)
+    log.info("🔧 Configuration Check:")
+    log.info("   Databricks Host: %s", databricks_config['host'])
+    log.info("   DATABRICKS_HOST (env): %s", os.getenv('DATABRICKS_HOST', 'NOT SET'))
+    log.info("   GENIE_SPACE_ID: %s", os.getenv('GENIE_SPACE_ID', 'NOT SET'))
+    log.info("   SQL_WAREHOUSE_ID: %s", os.getenv('SQL_WAREHOUSE_ID', 'NOT SET'))
+    log.info("   DATABRICKS_CLIENT_ID: %s", os.getenv('DATABRICKS_CLIENT_ID', 'NOT SET')[:20] + '...' if os.getenv('DATABRICKS_CLIENT_ID') else 'NOT SET')
+    log.info("   OAuth/OBO Mode: %s", 'YES' if os.getenv('DATABRICKS_CLIENT_ID') else 'NO')
+    log.info("   PORT: %s", PORT)
+    log.info("   WEB_CONCURRENCY: %s", WEB_CONCURRENCY)
+    log.info("   HTTP_WORKERS: %s", HTTP_WORKERS)
+    log.info("=" * 60)
+    
+    with ThreadedServer(("", PORT), CustomHandler) as httpd:
+        log.info("🚀 Server started successfully on port %s", PORT)
+        log.info("📁 Serving files from: %s/ (%d memory-mapped)", STATIC_DIR, len(STATIC))
+        log.info("🌐 Access at: http://localhost:%s", PORT)
+        if WEB_CONCURRENCY > 1:
+            sys.exit(run_workers(httpd, WEB_CONCURRENCY))
+        else:
+            httpd.serve_forever()
 